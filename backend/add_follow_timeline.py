@@ -0,0 +1,27 @@
+from app import app, db
+from models import Follow, Timeline
+from sqlalchemy import text
+
+# ==============================================================================
+# DB 마이그레이션 스크립트 (팔로우 / 홈 타임라인)
+# ==============================================================================
+# 1. Member 테이블에 followerCount 컬럼 추가
+# 2. 셀럽 조회용 인덱스(Member.followerCount, Post(userKey, postKey)) 추가
+# 3. Follow, Timeline 테이블 생성 (create_all은 이미 있는 테이블은 건드리지 않습니다)
+with app.app_context():
+    statements = [
+        ("ALTER TABLE Member ADD COLUMN followerCount INT NOT NULL DEFAULT 0", "'followerCount' column"),
+        ("CREATE INDEX IX_Member_followerCount ON Member (followerCount)", "IX_Member_followerCount index"),
+        ("CREATE INDEX IX_Post_user_post ON Post (userKey, postKey)", "IX_Post_user_post index"),
+    ]
+    for sql, name in statements:
+        try:
+            with db.engine.connect() as connection:
+                connection.execute(text(sql))
+                connection.commit()
+                print(f"Successfully added {name}.")
+        except Exception as e:
+            print(f"Error ({name} might already exist): {e}")
+
+    db.create_all()
+    print("Follow / Timeline tables are ready.")
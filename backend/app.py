@@ -2,7 +2,9 @@ from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from models import db, Member, Post, Comment, Likes
+from models import db, Member, Post, Comment, Likes, Follow, Timeline
+from timeline import publish_post, backfill_follow, leaves_celebrity, handle_unfollowed, remove_followee_posts, read_timeline
+from write_buffer import like_buffer
 from dotenv import load_dotenv
 import os
 import datetime
@@ -31,8 +33,76 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # 만약 업로드 폴더가 없으면, 서버 시작할 때 자동으로 만들어줍니다.
 os.makedirs(os.path.join(app.root_path, UPLOAD_FOLDER), exist_ok=True)
 
+# 홈 타임라인 팬아웃 설정
+# - BATCH_SIZE: 백그라운드에서 팔로워 타임라인에 한 번에 INSERT 하는 줄 수
+# - CELEBRITY_THRESHOLD: 팔로워 수가 이 값 이상이면 글 작성 시 팬아웃하지 않고, 읽을 때 가져옵니다.
+# - BACKFILL_SIZE: 새로 팔로우했을 때 내 타임라인에 미리 채워 넣을 상대방의 최근 글 수
+app.config['TIMELINE_FANOUT_BATCH_SIZE'] = int(os.getenv('TIMELINE_FANOUT_BATCH_SIZE', 500))
+app.config['TIMELINE_CELEBRITY_THRESHOLD'] = int(os.getenv('TIMELINE_CELEBRITY_THRESHOLD', 10000))
+app.config['TIMELINE_BACKFILL_SIZE'] = int(os.getenv('TIMELINE_BACKFILL_SIZE', 20))
+
+# 좋아요 쓰기 버퍼(write-behind) 설정
+# - ENABLED: 켜면 좋아요/취소를 바로 commit 하지 않고 메모리에 모았다가 한꺼번에 DB에 반영합니다.
+# - FLUSH_SIZE / FLUSH_INTERVAL: 대기 중인 변경이 이 개수 이상이 되거나, 이 시간(초)이 지나면 반영
+# - BATCH_SIZE: multi-row INSERT / DELETE 한 번에 담을 최대 줄 수
+# - SPILL_PATH: 서버가 죽어도 잃어버리지 않도록 대기 중인 변경을 기록해 두는 파일
+app.config['WRITE_BEHIND_ENABLED'] = os.getenv('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+app.config['WRITE_BEHIND_FLUSH_SIZE'] = int(os.getenv('WRITE_BEHIND_FLUSH_SIZE', 1000))
+app.config['WRITE_BEHIND_FLUSH_INTERVAL'] = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 1.0))
+app.config['WRITE_BEHIND_BATCH_SIZE'] = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500))
+app.config['WRITE_BEHIND_SPILL_PATH'] = os.getenv('WRITE_BEHIND_SPILL_PATH', os.path.join(app.root_path, 'like_buffer.log'))
+
 # DB 객체와 Flask 앱 연결 (초기화)
 db.init_app(app)
+like_buffer.init_app(app)
+
+# ==============================================================================
+# 공통 함수
+# ==============================================================================
+
+# 게시물 목록을 프론트엔드로 보낼 JSON 형태로 변환합니다.
+# (좋아요 수, 작성자 프로필 사진, 댓글 목록, 내가 좋아요 눌렀는지 여부를 덧붙입니다.)
+def serialize_posts(posts, current_user_key):
+    result = []
+    for post in posts:
+        post_data = post.to_dict()
+
+        # 추가 정보 조회: 작성자 프로필 사진
+        author = Member.query.get(post.userKey)
+        post_data['profileImage'] = author.profileImage if author else None
+        
+        # 추가 정보 조회: 댓글 목록
+        comments = Comment.query.filter_by(postKey=post.postKey).order_by(Comment.commentDate.asc()).all()
+        post_data['comments'] = [c.to_dict() for c in comments]
+
+        result.append(post_data)
+
+    # 추가 정보 조회: 좋아요 수, 내가 이 글에 좋아요를 눌렀는지?
+    # 쓰기 버퍼를 켠 경우 아직 DB에 반영되지 않은 버퍼 내용까지 합칩니다.
+    # (버퍼와 맞는 DB 스냅샷을 얻기 위해 트랜잭션을 다시 시작할 수 있으므로, 다른 조회를 모두 끝낸 뒤에 합니다.)
+    post_keys = [post_data['postKey'] for post_data in result]
+
+    def load_likes():
+        if not post_keys:
+            return {}, set()
+        counts = dict(
+            db.session.query(Likes.postKey, db.func.count())
+            .filter(Likes.postKey.in_(post_keys))
+            .group_by(Likes.postKey)
+        )
+        liked = set()
+        if current_user_key:
+            liked = {
+                k for (k,) in db.session.query(Likes.postKey)
+                .filter(Likes.postKey.in_(post_keys), Likes.userKey == current_user_key)
+            }
+        return counts, liked
+
+    like_counts, is_liked = like_buffer.read_likes(post_keys, current_user_key, load_likes)
+    for post_data in result:
+        post_data['like_count'] = like_counts[post_data['postKey']]
+        post_data['is_liked'] = is_liked[post_data['postKey']]
+    return result
 
 # ==============================================================================
 # API 라우트 (경로) 정의
@@ -237,31 +307,7 @@ def handle_posts():
         # 최신 글이 위에 오도록 정렬 (desc: 내림차순, postingDate 기준)
         posts = query.order_by(Post.postingDate.desc()).all()
         
-        result = []
-        for post in posts:
-            post_data = post.to_dict()
-            
-            # 추가 정보 조회: 좋아요 수
-            like_count = Likes.query.filter_by(postKey=post.postKey).count()
-            post_data['like_count'] = like_count
-
-            # 추가 정보 조회: 작성자 프로필 사진
-            author = Member.query.get(post.userKey)
-            post_data['profileImage'] = author.profileImage if author else None
-            
-            # 추가 정보 조회: 댓글 목록
-            comments = Comment.query.filter_by(postKey=post.postKey).order_by(Comment.commentDate.asc()).all()
-            post_data['comments'] = [c.to_dict() for c in comments]
-            
-            # 추가 정보 조회: 내가 이 글에 좋아요를 눌렀는지?
-            current_user_key = request.args.get('userKey')
-            if current_user_key:
-                is_liked = Likes.query.filter_by(postKey=post.postKey, userKey=current_user_key).first() is not None
-                post_data['is_liked'] = is_liked
-            else:
-                post_data['is_liked'] = False
-
-            result.append(post_data)
+        result = serialize_posts(posts, request.args.get('userKey', type=int))
             
         return jsonify(result), 200
 
@@ -296,11 +342,20 @@ def handle_posts():
             try:
                 db.session.add(new_post)
                 db.session.commit()
-                return jsonify({"message": "Post created", "post": new_post.to_dict()}), 201
             except Exception as e:
                 db.session.rollback()
                 return jsonify({"message": str(e)}), 500
 
+            # 팔로워들의 홈 타임라인에 배포합니다. (팔로워 쪽은 백그라운드에서 batch 단위로 처리)
+            # 게시물은 이미 저장되었으므로, 여기서 실패해도 에러를 돌려주지 않고 로그만 남깁니다.
+            # (에러를 돌려주면 클라이언트가 다시 시도해서 같은 글이 두 번 올라갈 수 있습니다.)
+            try:
+                publish_post(new_post)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Timeline publish failed for post {new_post.postKey}: {e}")
+            return jsonify({"message": "Post created", "post": new_post.to_dict()}), 201
+
 # 7. 게시물 삭제
 @app.route('/api/posts/<int:post_id>', methods=['DELETE'])
 def delete_post(post_id):
@@ -318,6 +373,7 @@ def delete_post(post_id):
         # 게시물을 지우기 전에, 관련된 데이터(좋아요, 댓글)를 먼저 지워야 합니다 (참조 무결성).
         Likes.query.filter_by(postKey=post_id).delete()
         Comment.query.filter_by(postKey=post_id).delete()
+        Timeline.query.filter_by(postKey=post_id).delete()
         
         # 업로드했던 이미지 파일도 삭제 (서버 용량 관리)
         if post.photoSrc:
@@ -328,6 +384,8 @@ def delete_post(post_id):
         
         db.session.delete(post)
         db.session.commit()
+        # 삭제가 확정된 뒤에 버퍼에 남아 있던 이 게시물의 좋아요를 버립니다.
+        like_buffer.discard_post(post_id)
         return jsonify({"message": "Post deleted"}), 200
     except Exception as e:
         db.session.rollback()
@@ -358,7 +416,27 @@ def delete_comment(comment_id):
 @app.route('/api/posts/<int:post_id>/likes', methods=['POST'])
 def toggle_like(post_id):
     data = request.get_json()
-    user_key = data.get('userKey')
+    try:
+        user_key = int(data.get('userKey'))
+    except (TypeError, ValueError):
+        return jsonify({"message": "User info required"}), 400
+
+    # 게시물이나 사용자가 없으면 DB에 쓸 수 없는 좋아요이므로, 버퍼에 넣기 전에 거절합니다.
+    if not Post.query.get(post_id):
+        return jsonify({"message": "Post not found"}), 404
+    if not Member.query.get(user_key):
+        return jsonify({"message": "User not found"}), 404
+
+    # 쓰기 버퍼 모드: DB에 바로 commit 하지 않고 버퍼에 기록만 해 둡니다. (백그라운드에서 한꺼번에 반영)
+    if like_buffer.enabled:
+        try:
+            liked = like_buffer.toggle(
+                post_id, user_key,
+                lambda: Likes.query.filter_by(postKey=post_id, userKey=user_key).first() is not None
+            )
+            return jsonify({"message": "Liked" if liked else "Unliked", "liked": liked}), 200
+        except Exception as e:
+            return jsonify({"message": str(e)}), 500
     
     # 이미 좋아요가 있는지 체크
     existing_like = Likes.query.filter_by(postKey=post_id, userKey=user_key).first()
@@ -413,6 +491,89 @@ def add_comment(post_id):
         db.session.rollback()
         return jsonify({"message": str(e)}), 500
 
+# 11. 팔로우 / 언팔로우
+# POST: userKey(나)가 user_key(상대방)를 팔로우, DELETE: 팔로우 취소
+@app.route('/api/users/<int:user_key>/follow', methods=['POST', 'DELETE'])
+def handle_follow(user_key):
+    if request.method == 'POST':
+        data = request.get_json()
+        follower_key = data.get('userKey')
+    else:
+        follower_key = request.args.get('userKey')
+
+    try:
+        follower_key = int(follower_key)
+    except (TypeError, ValueError):
+        return jsonify({"message": "User info required"}), 400
+
+    if follower_key == user_key:
+        return jsonify({"message": "자기 자신은 팔로우할 수 없습니다."}), 400
+
+    if not Member.query.get(user_key) or not Member.query.get(follower_key):
+        return jsonify({"message": "User not found"}), 404
+
+    crossed = False
+    try:
+        if request.method == 'POST':
+            existing_follow = Follow.query.get((follower_key, user_key))
+            if existing_follow:
+                return jsonify({"message": "Already following", "following": True}), 200
+            db.session.add(Follow(followerKey=follower_key, followeeKey=user_key))
+            # 팔로워 수는 UPDATE ... SET followerCount = followerCount + 1 로 DB에서 직접 증가시킵니다.
+            # (파이썬에서 읽고 더해서 쓰면 동시에 여러 명이 팔로우할 때 값이 꼬일 수 있습니다.)
+            Member.query.filter_by(userKey=user_key).update({Member.followerCount: Member.followerCount + 1})
+            db.session.commit()
+        else:
+            # 상대방 행을 잠그고(SELECT ... FOR UPDATE) 줄어들기 전의 팔로워 수를 읽습니다.
+            # 동시에 여러 명이 언팔로우해도 한 번에 한 요청씩 처리되므로,
+            # 셀럽 기준 아래로 내려가는 순간을 정확히 한 요청만 알아챌 수 있습니다.
+            followee = Member.query.filter_by(userKey=user_key).with_for_update().one()
+            existing_follow = Follow.query.get((follower_key, user_key))
+            if not existing_follow:
+                db.session.rollback()
+                return jsonify({"message": "Not following", "following": False}), 200
+            crossed = leaves_celebrity(followee.followerCount)
+            db.session.delete(existing_follow)
+            Member.query.filter_by(userKey=user_key).update({Member.followerCount: Member.followerCount - 1})
+            remove_followee_posts(follower_key, user_key)
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 500
+
+    # 팔로우 자체는 이미 저장되었으므로, 타임라인 작업이 실패해도 에러를 돌려주지 않고 로그만 남깁니다.
+    try:
+        if request.method == 'POST':
+            # 상대방의 최근 글을 내 타임라인에 채워 넣습니다.
+            backfill_follow(follower_key, user_key)
+        else:
+            # 팔로워 수가 셀럽 기준 아래로 내려갔다면, 최근 글을 팔로워들에게 팬아웃합니다.
+            handle_unfollowed(user_key, crossed)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Timeline update failed for follow {follower_key} -> {user_key}: {e}")
+
+    if request.method == 'POST':
+        return jsonify({"message": "Followed", "following": True}), 200
+    return jsonify({"message": "Unfollowed", "following": False}), 200
+
+# 12. 홈 타임라인 (팔로우한 사람들의 글)
+# 커서 기반 페이지네이션: 응답의 nextCursor를 다음 요청의 cursor로 넘기면 이어서 가져옵니다.
+@app.route('/api/timeline', methods=['GET'])
+def get_timeline():
+    user_key = request.args.get('userKey', type=int)
+    if not user_key:
+        return jsonify({"message": "No userKey provided"}), 400
+
+    cursor = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+    posts, next_cursor = read_timeline(user_key, cursor=cursor, limit=limit)
+    return jsonify({
+        "posts": serialize_posts(posts, user_key),
+        "nextCursor": next_cursor
+    }), 200
+
 # 메인 실행 블록
 if __name__ == '__main__':
     with app.app_context():
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+import time
+
+# ==============================================================================
+# 팬아웃 비용 벤치마크
+# ==============================================================================
+# 팔로워 수에 따라 글 하나를 팔로워 타임라인에 배포(fan_out_post)하는 데 걸리는 시간과,
+# 홈 타임라인 한 페이지를 읽는(read_timeline) 데 걸리는 시간을 측정합니다.
+# 기본은 임시 SQLite 파일을 사용하고, DATABASE_URI를 지정하면 그 DB(MariaDB 등)에서 측정합니다.
+#   사용법: python bench_fanout.py [팔로워 수 ...]
+#   주의: 지정한 DB의 테이블을 모두 새로 만듭니다. 운영 DB에 실행하지 마세요.
+if not os.getenv('DATABASE_URI'):
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+from app import app, db
+from models import Member, Post, Follow, Timeline
+from timeline import fan_out_post, read_timeline
+from sqlalchemy import insert
+
+follower_counts = [int(n) for n in sys.argv[1:]] or [100, 1000, 10000, 50000]
+
+with app.app_context():
+    db.drop_all()
+    db.create_all()
+
+    max_followers = max(follower_counts)
+    print(f"Creating {max_followers + 1} members...")
+    db.session.execute(insert(Member), [
+        {'userID': f"bench{i}@example.com", 'userPW': 'x'} for i in range(max_followers + 1)
+    ])
+    db.session.commit()
+    member_keys = [k for (k,) in db.session.query(Member.userKey).order_by(Member.userKey)]
+
+    print(f"batch size: {app.config['TIMELINE_FANOUT_BATCH_SIZE']}")
+    print(f"{'followers':>10} | {'fan-out (ms)':>12} | {'rows/s':>10} | {'read (ms)':>9}")
+    for count in follower_counts:
+        # 매번 새 작성자를 만들고 count명의 팔로워를 붙입니다.
+        author = Member(userID=f"author{count}@example.com", userPW='x', followerCount=count)
+        db.session.add(author)
+        db.session.commit()
+        db.session.execute(insert(Follow), [
+            {'followerKey': k, 'followeeKey': author.userKey} for k in member_keys[:count]
+        ])
+        post = Post(userKey=author.userKey, userID=author.userID, content='bench')
+        db.session.add(post)
+        db.session.commit()
+
+        start = time.perf_counter()
+        fan_out_post(post.postKey, author.userKey)
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read_timeline(member_keys[0], limit=20)
+        read_elapsed = time.perf_counter() - start
+
+        print(f"{count:>10} | {elapsed * 1000:>12.1f} | {count / elapsed:>10.0f} | {read_elapsed * 1000:>9.2f}")
+
+    print(f"Total timeline rows: {Timeline.query.count()}")
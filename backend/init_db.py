@@ -1,5 +1,5 @@
 from app import app, db
-from models import Member, Post, Comment, Likes
+from models import Member, Post, Comment, Likes, Follow, Timeline
 
 with app.app_context():
     db.create_all()
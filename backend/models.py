@@ -36,6 +36,16 @@ class Member(db.Model):
     # nullable=True: 소개글은 비워둘 수 있습니다.
     description = db.Column(db.String(500), nullable=True)
 
+    # followerCount: 이 사용자를 팔로우하는 사람 수 (반정규화)
+    # 매번 Follow 테이블을 COUNT 하지 않아도 되도록 팔로우/언팔로우 시점에 함께 갱신합니다.
+    # 타임라인 팬아웃에서 '팔로워가 아주 많은 계정(셀럽)'인지 판단하는 데에도 사용됩니다.
+    followerCount = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # 셀럽(팔로워가 아주 많은 계정) 목록을 전체 회원을 훑지 않고 바로 찾기 위한 인덱스입니다.
+    __table_args__ = (
+        db.Index('IX_Member_followerCount', 'followerCount'),
+    )
+
     # to_dict: 파이썬 객체(Member)를 딕셔너리(JSON) 형태로 변환해주는 함수
     # 프론트엔드로 데이터를 보낼 때는 반드시 JSON 포맷이어야 하기 때문에 이 함수가 필요합니다.
     # 주의: userPW(비밀번호)는 보안상 절대 포함하지 않습니다.
@@ -44,7 +54,8 @@ class Member(db.Model):
             'userKey': self.userKey,
             'userID': self.userID,
             'profileImage': self.profileImage,
-            'description': self.description or "" # None이면 빈 문자열 반환
+            'description': self.description or "", # None이면 빈 문자열 반환
+            'followerCount': self.followerCount or 0
         }
 
 # ==============================================================================
@@ -76,6 +87,12 @@ class Post(db.Model):
     # content: 게시글 내용 (캡션)
     content = db.Column(db.Text)
 
+    # 특정 사용자의 최신 글을 "userKey = ? ORDER BY postKey DESC LIMIT n"으로 바로 읽기 위한 인덱스입니다.
+    # (홈 타임라인에서 셀럽의 글을 가져올 때 사용)
+    __table_args__ = (
+        db.Index('IX_Post_user_post', 'userKey', 'postKey'),
+    )
+
     def to_dict(self):
         return {
             'postKey': self.postKey,
@@ -139,3 +156,46 @@ class Likes(db.Model):
     # 의미: "한 사용자가 같은 게시물에 좋아요를 두 번 누를 수 없다"는 제약사항을 DB 차원에서 강제합니다.
     postKey = db.Column(db.Integer, db.ForeignKey('Post.postKey'), primary_key=True, nullable=False)
     userKey = db.Column(db.Integer, db.ForeignKey('Member.userKey'), primary_key=True, nullable=False)
+
+# ==============================================================================
+# 5. 팔로우(Follow) 모델 정의
+# ==============================================================================
+# '누가(follower)' '누구를(followee)' 팔로우하는지 저장하는 테이블입니다.
+class Follow(db.Model):
+    __tablename__ = 'Follow'
+
+    # 복합 기본키 (followerKey, followeeKey)
+    # "내가 팔로우하는 사람 목록"은 기본키의 앞부분(followerKey)만으로 바로 찾을 수 있습니다.
+    followerKey = db.Column(db.Integer, db.ForeignKey('Member.userKey'), primary_key=True, nullable=False)
+    followeeKey = db.Column(db.Integer, db.ForeignKey('Member.userKey'), primary_key=True, nullable=False)
+    followDate = db.Column(db.DateTime, server_default=db.func.now())
+
+    # 반대 방향 조회("나를 팔로우하는 사람 목록", 팬아웃 대상)를 위한 인덱스입니다.
+    # followerKey까지 포함해 두면 팬아웃 시 followerKey 기준으로 끊어 읽는(keyset) 범위 검색이 가능합니다.
+    __table_args__ = (
+        db.Index('IX_Follow_followee', 'followeeKey', 'followerKey'),
+    )
+
+# ==============================================================================
+# 6. 타임라인(Timeline) 모델 정의
+# ==============================================================================
+# 사용자별 '홈 피드'를 미리 만들어 두는(materialized) 테이블입니다.
+# 글이 작성되면 작성자의 팔로워마다 한 줄씩 (userKey, postKey)를 넣어 둡니다 (fan-out-on-write).
+# 덕분에 홈 피드를 읽을 때는 팔로우 목록과 조인할 필요 없이 이 테이블만 범위 검색하면 됩니다.
+class Timeline(db.Model):
+    __tablename__ = 'Timeline'
+
+    # userKey: 이 타임라인의 주인 (피드를 보는 사람)
+    # postKey: 피드에 보여줄 게시물
+    # 기본키 (userKey, postKey) 순서 덕분에 "userKey = ? AND postKey < 커서 ORDER BY postKey DESC"가
+    # 인덱스 한 번의 범위 검색으로 끝납니다.
+    userKey = db.Column(db.Integer, db.ForeignKey('Member.userKey'), primary_key=True, nullable=False)
+    postKey = db.Column(db.Integer, db.ForeignKey('Post.postKey'), primary_key=True, nullable=False)
+
+    # authorKey: 게시물 작성자 (언팔로우 시 해당 작성자의 글만 골라서 지우기 위해 저장)
+    authorKey = db.Column(db.Integer, db.ForeignKey('Member.userKey'), nullable=False)
+
+    # 게시물 삭제 시 그 글이 들어간 모든 타임라인 줄을 지우기 위한 인덱스입니다.
+    __table_args__ = (
+        db.Index('IX_Timeline_post', 'postKey'),
+    )
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py는 import 될 때 DATABASE_URI로 DB를 연결하므로, import 전에 테스트용 SQLite 파일을 지정합니다.
+os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'api.db')
+
+from models import db, Member, Post
+from write_buffer import LikeWriteBuffer
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    app.config['WRITE_BEHIND_ENABLED'] = True
+    # 테스트에서는 백그라운드 스레드가 알아서 flush 하지 않도록 크게 잡고, flush()를 직접 호출합니다.
+    app.config['WRITE_BEHIND_FLUSH_SIZE'] = 1000
+    app.config['WRITE_BEHIND_FLUSH_INTERVAL'] = 60
+    app.config['WRITE_BEHIND_BATCH_SIZE'] = 2
+    app.config['WRITE_BEHIND_SPILL_PATH'] = str(tmp_path / 'like_buffer.log')
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        for i in range(3):
+            db.session.add(Member(userID=f"user{i}@example.com", userPW='x'))
+        db.session.add(Post(userKey=1, userID='user0@example.com', content='post'))
+        db.session.commit()
+        yield app
+
+
+@pytest.fixture
+def flask_app():
+    # app.py의 실제 라우트를 쓰는 테스트용 (회원 5명으로 초기화)
+    from app import app as flask_app
+
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        for i in range(1, 6):
+            db.session.add(Member(userID=f"user{i}@example.com", userPW='x'))
+        db.session.commit()
+        yield flask_app
+
+
+@pytest.fixture
+def make_buffer(app):
+    buffers = []
+
+    def _make():
+        buffer = LikeWriteBuffer()
+        buffer.init_app(app)
+        buffer._ensure_started()
+        buffers.append(buffer)
+        return buffer
+
+    yield _make
+    for buffer in buffers:
+        buffer.shutdown()
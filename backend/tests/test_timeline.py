@@ -0,0 +1,143 @@
+import pytest
+
+import timeline
+from models import db, Member, Post, Follow, Timeline
+from timeline import publish_post
+
+
+class ImmediateExecutor:
+    # 백그라운드 팬아웃을 요청 안에서 바로 실행해서, 테스트 결과가 스레드 타이밍에 좌우되지 않도록 합니다.
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def client(flask_app, monkeypatch):
+    monkeypatch.setattr(timeline, '_executor', ImmediateExecutor())
+    monkeypatch.setitem(flask_app.config, 'TIMELINE_CELEBRITY_THRESHOLD', 2)
+    monkeypatch.setitem(flask_app.config, 'TIMELINE_BACKFILL_SIZE', 5)
+    monkeypatch.setitem(flask_app.config, 'TIMELINE_FANOUT_BATCH_SIZE', 2)
+    return flask_app.test_client()
+
+
+def follow(client, follower_key, followee_key):
+    return client.post(f"/api/users/{followee_key}/follow", json={'userKey': follower_key})
+
+
+def unfollow(client, follower_key, followee_key):
+    return client.delete(f"/api/users/{followee_key}/follow?userKey={follower_key}")
+
+
+def write_post(author_key):
+    author = db.session.get(Member, author_key)
+    post = Post(userKey=author_key, userID=author.userID, content='post')
+    db.session.add(post)
+    db.session.commit()
+    publish_post(post)
+    return post.postKey
+
+
+def timeline_keys(client, user_key, **params):
+    query = ''.join(f"&{k}={v}" for k, v in params.items())
+    res = client.get(f"/api/timeline?userKey={user_key}{query}")
+    assert res.status_code == 200
+    return [p['postKey'] for p in res.json['posts']], res.json['nextCursor']
+
+
+def timeline_rows(user_key):
+    return sorted(k for (k,) in db.session.query(Timeline.postKey).filter_by(userKey=user_key))
+
+
+def test_post_fans_out_to_followers(client):
+    follow(client, 2, 1)
+    post_key = write_post(1)
+
+    assert timeline_rows(1) == [post_key]
+    assert timeline_rows(2) == [post_key]
+    assert timeline_rows(3) == []
+    assert timeline_keys(client, 2) == ([post_key], None)
+
+
+def test_follow_backfills_recent_posts(client):
+    post_keys = [write_post(1) for _ in range(3)]
+    follow(client, 2, 1)
+
+    assert timeline_rows(2) == post_keys
+    assert db.session.get(Member, 1).followerCount == 1
+
+
+def test_celebrity_posts_are_merged_on_read_without_duplicates(client):
+    early_key = write_post(1)
+    follow(client, 2, 1)
+    follow(client, 3, 1)  # 팔로워 2명 -> 셀럽
+    celebrity_key = write_post(1)
+
+    # 셀럽이 된 뒤의 글은 팬아웃되지 않습니다.
+    assert timeline_rows(2) == [early_key]
+    # 읽을 때는 팬아웃된 글과 셀럽의 글이 합쳐지고, 양쪽에 모두 있는 글은 한 번만 나옵니다.
+    assert timeline_keys(client, 2) == ([celebrity_key, early_key], None)
+    assert timeline_keys(client, 3) == ([celebrity_key, early_key], None)
+
+
+def test_cursor_pagination_across_celebrity_merge(client):
+    follow(client, 2, 1)
+    follow(client, 3, 1)  # 1번은 셀럽
+    follow(client, 2, 4)  # 4번은 일반 계정
+    post_keys = [write_post(author) for author in (1, 4, 1, 4, 4, 1, 1)]
+
+    pages = []
+    cursor = None
+    while True:
+        params = {'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+        keys, cursor = timeline_keys(client, 2, **params)
+        pages.append(keys)
+        if cursor is None:
+            break
+
+    assert [k for page in pages for k in page] == sorted(post_keys, reverse=True)
+    assert all(len(page) <= 2 for page in pages)
+
+
+def test_unfollow_removes_followee_rows(client):
+    follow(client, 2, 1)
+    follow(client, 2, 4)
+    write_post(1)
+    other_key = write_post(4)
+
+    res = unfollow(client, 2, 1)
+    assert res.json['following'] is False
+    assert timeline_rows(2) == [other_key]
+    assert db.session.get(Follow, (2, 1)) is None
+    assert db.session.get(Member, 1).followerCount == 0
+
+
+def test_dropping_below_threshold_fans_out_recent_posts(client):
+    follow(client, 2, 1)
+    follow(client, 3, 1)  # 셀럽
+    follow(client, 4, 1)
+    post_key = write_post(1)
+    assert timeline_rows(2) == []
+
+    unfollow(client, 4, 1)  # 3 -> 2: 아직 셀럽
+    assert timeline_rows(2) == []
+
+    unfollow(client, 3, 1)  # 2 -> 1: 셀럽 기준 아래로 내려감
+    assert timeline_rows(2) == [post_key]
+    assert timeline_keys(client, 2) == ([post_key], None)
+
+
+def test_follow_validation(client):
+    assert follow(client, 'abc', 1).status_code == 400
+    assert client.post('/api/users/1/follow', json={}).status_code == 400
+    assert follow(client, 1, 1).status_code == 400
+    assert follow(client, 2, 99).status_code == 404
+    assert follow(client, 99, 1).status_code == 404
+    assert unfollow(client, 'abc', 1).status_code == 400
+    assert unfollow(client, 2, 1).json['following'] is False
+
+
+def test_timeline_validation(client):
+    assert client.get('/api/timeline').status_code == 400
+    assert client.get('/api/timeline?userKey=abc').status_code == 400
@@ -0,0 +1,198 @@
+import os
+import threading
+
+from flask_sqlalchemy.session import Session
+from models import db, Likes
+
+# pid_max(최대 4194304)보다 큰 값이라 살아 있는 프로세스와 겹치지 않습니다.
+DEAD_PID = 4194305
+
+
+def load_liked(post_key, user_key):
+    return lambda: Likes.query.filter_by(postKey=post_key, userKey=user_key).first() is not None
+
+
+def read_post(buffer, user_key, post_key=1):
+    # serialize_posts와 같은 방식으로 (좋아요 수, 내가 좋아요를 눌렀는지)를 읽습니다.
+    def load_likes():
+        counts = {post_key: Likes.query.filter_by(postKey=post_key).count()}
+        liked = {k for (k,) in db.session.query(Likes.postKey).filter_by(postKey=post_key, userKey=user_key)}
+        return counts, liked
+
+    counts, liked = buffer.read_likes([post_key], user_key, load_likes)
+    return counts[post_key], liked[post_key]
+
+
+def db_likes():
+    return sorted((like.postKey, like.userKey) for like in Likes.query.all())
+
+
+def test_opposite_toggles_cancel_out(make_buffer):
+    buffer = make_buffer()
+
+    assert buffer.toggle(1, 2, load_liked(1, 2)) is True
+    assert read_post(buffer, 2) == (1, True)
+
+    assert buffer.toggle(1, 2, load_liked(1, 2)) is False
+    assert buffer._pending == {}
+    assert read_post(buffer, 2) == (0, False)
+
+    buffer.flush()
+    assert db_likes() == []
+
+
+def test_flush_writes_batches_and_merges_reads(make_buffer):
+    buffer = make_buffer()
+    for user_key in (1, 2, 3):
+        buffer.toggle(1, user_key, load_liked(1, user_key))
+
+    buffer.flush()
+    assert db_likes() == [(1, 1), (1, 2), (1, 3)]
+    assert read_post(buffer, 3) == (3, True)
+
+    # DB에 반영된 좋아요를 취소하면 버퍼 기준으로는 바로 -1이 보입니다.
+    assert buffer.toggle(1, 3, load_liked(1, 3)) is False
+    assert read_post(buffer, 3) == (2, False)
+    buffer.flush()
+    assert db_likes() == [(1, 1), (1, 2)]
+
+
+def test_read_retries_when_flush_commits_during_db_read(make_buffer):
+    buffer = make_buffer()
+    buffer.toggle(1, 2, load_liked(1, 2))
+    calls = []
+
+    def load_likes():
+        # 첫 번째 조회는 flush 전의 DB를 읽고, 돌려주기 직전에 flush가 commit 됩니다.
+        # (REPEATABLE READ 스냅샷이 flush보다 먼저 고정된 상황과 같습니다)
+        counts = {1: Likes.query.filter_by(postKey=1).count()}
+        liked = {k for (k,) in db.session.query(Likes.postKey).filter_by(postKey=1, userKey=2)}
+        if not calls:
+            buffer.flush()
+        calls.append(counts)
+        return counts, liked
+
+    counts, liked = buffer.read_likes([1], 2, load_likes)
+
+    # 오래된 스냅샷과 비워진 버퍼를 합치지 않고, 다시 읽어서 방금 반영된 좋아요를 보여줍니다.
+    assert calls == [{1: 0}, {1: 1}]
+    assert counts == {1: 1}
+    assert liked == {1: True}
+
+
+def test_concurrent_toggles_are_all_synced(app, make_buffer):
+    buffer = make_buffer()
+
+    def like(user_key):
+        with app.app_context():
+            buffer.toggle(1, user_key, load_liked(1, user_key))
+
+    threads = [threading.Thread(target=like, args=(user_key,)) for user_key in range(1, 21)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 여러 요청이 fsync 한 번으로 묶이더라도, 응답한 요청은 모두 디스크에 기록되어 있어야 합니다.
+    assert buffer._synced == buffer._written == 20
+    with open(buffer._spill_path) as f:
+        assert len(f.readlines()) == 20
+    assert read_post(buffer, 1) == (20, True)
+
+
+def test_failed_flush_is_retried(make_buffer, monkeypatch):
+    buffer = make_buffer()
+    buffer.toggle(1, 2, load_liked(1, 2))
+    buffer.toggle(1, 3, load_liked(1, 3))
+
+    def fail_commit(self):
+        raise RuntimeError('database is down')
+
+    monkeypatch.setattr(Session, 'commit', fail_commit)
+    buffer.flush()
+    monkeypatch.undo()
+
+    # 실패한 변경은 pending으로 돌아오고, spill file에도 그대로 남아 있어야 합니다.
+    assert buffer._inflight == {}
+    assert buffer._pending == {1: {2: (True, False), 3: (True, False)}}
+    assert not os.path.exists(buffer._spill_path + '.flushing')
+    with open(buffer._spill_path) as f:
+        assert len(f.readlines()) == 2
+
+    # 되돌아온 변경과 반대되는 요청은 여전히 상쇄됩니다.
+    assert buffer.toggle(1, 3, load_liked(1, 3)) is False
+    assert buffer._pending == {1: {2: (True, False)}}
+
+    buffer.flush()
+    assert db_likes() == [(1, 2)]
+    assert buffer._pending == {}
+
+
+def test_recovers_truncated_spill_file_of_dead_process(app, make_buffer):
+    base = app.config['WRITE_BEHIND_SPILL_PATH']
+    # 죽은 프로세스가 flush 도중 남긴 파일과, 마지막 줄을 쓰다가 잘린 본 파일
+    with open(f"{base}.{DEAD_PID}.flushing", 'w') as f:
+        f.write('[1, 2, false]\n[1, 1, true]\n')
+    with open(f"{base}.{DEAD_PID}", 'w') as f:
+        f.write('[1, 2, true]\n[1, 3, tr')
+
+    buffer = make_buffer()
+
+    # 나중 기록이 이기고, 잘린 줄은 버려집니다. 원래 상태를 모르므로 baseline은 None입니다.
+    assert buffer._pending == {1: {1: (True, None), 2: (True, None)}}
+    assert read_post(buffer, 1) == (0, True)
+    assert not os.path.exists(f"{base}.{DEAD_PID}")
+    assert not os.path.exists(f"{base}.{DEAD_PID}.flushing")
+
+    buffer.flush()
+    assert db_likes() == [(1, 1), (1, 2)]
+    with open(buffer._spill_path) as f:
+        assert f.read() == ''
+
+
+def test_spill_file_of_live_process_is_left_alone(app, make_buffer):
+    # 부모 프로세스(살아 있음)의 파일은 다른 워커가 쓰고 있는 것으로 보고 가져오지 않습니다.
+    live_path = f"{app.config['WRITE_BEHIND_SPILL_PATH']}.{os.getppid()}"
+    with open(live_path, 'w') as f:
+        f.write('[1, 2, true]\n')
+
+    buffer = make_buffer()
+
+    assert buffer._pending == {}
+    assert os.path.exists(live_path)
+
+
+def test_toggle_like_validates_before_buffering(flask_app, tmp_path, monkeypatch):
+    import app as app_module
+    from write_buffer import LikeWriteBuffer
+    from models import Post
+
+    monkeypatch.setitem(flask_app.config, 'WRITE_BEHIND_SPILL_PATH', str(tmp_path / 'like_buffer.log'))
+    monkeypatch.setitem(flask_app.config, 'WRITE_BEHIND_FLUSH_INTERVAL', 60)
+    buffer = LikeWriteBuffer()
+    buffer.app = flask_app
+    buffer.enabled = True
+    buffer._ensure_started()
+    monkeypatch.setattr(app_module, 'like_buffer', buffer)
+
+    db.session.add(Post(userKey=1, userID='user1@example.com', content='post'))
+    db.session.commit()
+    client = flask_app.test_client()
+
+    try:
+        assert client.post('/api/posts/1/likes', json={'userKey': 'abc'}).status_code == 400
+        assert client.post('/api/posts/1/likes', json={}).status_code == 400
+        assert client.post('/api/posts/99/likes', json={'userKey': 2}).status_code == 404
+        assert client.post('/api/posts/1/likes', json={'userKey': 99}).status_code == 404
+        # 거절된 요청은 버퍼에도, spill file에도 남지 않습니다.
+        assert buffer._pending == {}
+        assert buffer._written == 0
+
+        res = client.post('/api/posts/1/likes', json={'userKey': 2})
+        assert res.json == {"message": "Liked", "liked": True}
+        post = client.get('/api/posts?userKey=2').json[0]
+        assert (post['like_count'], post['is_liked']) == (1, True)
+    finally:
+        buffer.shutdown()
+
+    assert db_likes() == [(1, 2)]
@@ -0,0 +1,180 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import insert, exists
+from models import db, Member, Post, Follow, Timeline
+
+# ==============================================================================
+# 홈 타임라인 (팬아웃) 로직
+# ==============================================================================
+# 글을 쓸 때 팔로워들의 타임라인에 미리 넣어 두는 방식(fan-out-on-write)과
+# 팔로워가 아주 많은 계정(셀럽)의 글은 읽을 때 가져오는 방식(fan-out-on-read)을 섞어서 사용합니다.
+# - 일반 계정: 글 작성 -> 백그라운드에서 팔로워 목록을 일정 크기(batch)씩 끊어서 Timeline에 INSERT
+# - 셀럽 계정: 팔로워 수만큼 INSERT 하면 너무 비싸므로 팬아웃하지 않고, 읽을 때 Post 테이블에서 직접 가져옴
+# 셀럽 기준(TIMELINE_CELEBRITY_THRESHOLD) 아래로 내려가는 순간에는 읽을 때 합쳐지지 않게 되므로,
+# 그 계정의 최근 글(TIMELINE_BACKFILL_SIZE개)을 모든 팔로워의 타임라인에 한 번 팬아웃해 줍니다.
+# (셀럽이던 동안 팔로우한 사람들도 이때 함께 채워집니다. 기준을 다시 넘는 경우에는 할 일이 없습니다.)
+
+# 팬아웃 작업을 처리할 백그라운드 스레드 풀
+# 큐는 메모리에만 있으므로 서버가 재시작되면 남아 있던 팬아웃 작업은 사라집니다. (project_documentation.md 참고)
+# 작업자 수를 제한해서, 글이 한꺼번에 많이 올라와도 DB 연결을 과도하게 점유하지 않도록 합니다.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='fanout')
+
+
+def is_celebrity(member):
+    # 팔로워 수가 기준치 이상이면 '셀럽'으로 보고 쓰기 시점 팬아웃을 건너뜁니다.
+    threshold = current_app.config['TIMELINE_CELEBRITY_THRESHOLD']
+    return member is not None and (member.followerCount or 0) >= threshold
+
+
+def _insert_timeline_rows(rows):
+    # 여러 줄을 한 번의 multi-row INSERT로 넣습니다.
+    # 팔로우 직후의 백필(backfill)과 팬아웃이 겹쳐 이미 들어간 줄이 있거나,
+    # 팬아웃 도중 게시물이 삭제된 경우에도 나머지 줄은 계속 넣을 수 있도록 INSERT IGNORE를 사용합니다.
+    if not rows:
+        return
+    insert_stmt = (
+        insert(Timeline)
+        .prefix_with('IGNORE', dialect='mysql')
+        .prefix_with('IGNORE', dialect='mariadb')
+        .prefix_with('OR IGNORE', dialect='sqlite')
+    )
+    db.session.execute(insert_stmt.values(rows))
+    db.session.commit()
+
+
+def fan_out_post(post_key, author_key):
+    # 작성자의 팔로워 목록을 followerKey 순으로 batch 크기만큼 끊어 읽으면서 타임라인에 넣습니다.
+    # OFFSET 대신 "마지막으로 읽은 followerKey보다 큰 것"(keyset)으로 이어 읽기 때문에
+    # 팔로워가 많아도 각 batch가 인덱스(IX_Follow_followee) 범위 검색 한 번으로 끝납니다.
+    batch_size = current_app.config['TIMELINE_FANOUT_BATCH_SIZE']
+    last_key = 0
+    while True:
+        follower_keys = [
+            k for (k,) in db.session.query(Follow.followerKey)
+            .filter(Follow.followeeKey == author_key, Follow.followerKey > last_key)
+            .order_by(Follow.followerKey.asc())
+            .limit(batch_size)
+        ]
+        if not follower_keys:
+            break
+        _insert_timeline_rows([
+            {'userKey': k, 'postKey': post_key, 'authorKey': author_key} for k in follower_keys
+        ])
+        last_key = follower_keys[-1]
+        if len(follower_keys) < batch_size:
+            break
+
+
+def _run_fan_out(app, post_key, author_key):
+    # 백그라운드 스레드에는 Flask 앱 컨텍스트가 없으므로 직접 열어줍니다.
+    with app.app_context():
+        try:
+            fan_out_post(post_key, author_key)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Fan-out failed for post {post_key}: {e}")
+
+
+def publish_post(post):
+    # 새 게시물을 타임라인에 배포합니다.
+    # 작성자 본인의 타임라인에는 바로 넣어서, 글을 쓰자마자 내 홈 피드에서 보이도록 합니다.
+    _insert_timeline_rows([{'userKey': post.userKey, 'postKey': post.postKey, 'authorKey': post.userKey}])
+
+    author = Member.query.get(post.userKey)
+    if is_celebrity(author):
+        # 셀럽의 글은 팬아웃하지 않습니다. (읽을 때 read_timeline에서 가져옴)
+        return
+
+    app = current_app._get_current_object()
+    _executor.submit(_run_fan_out, app, post.postKey, post.userKey)
+
+
+def backfill_follow(follower_key, followee_key):
+    # 새로 팔로우했을 때, 상대방의 최근 글 몇 개를 내 타임라인에 미리 채워 넣습니다.
+    # (셀럽은 읽을 때 가져오므로 채울 필요가 없습니다.)
+    followee = Member.query.get(followee_key)
+    if is_celebrity(followee):
+        return
+    recent_keys = _recent_post_keys(followee_key)
+    _insert_timeline_rows([
+        {'userKey': follower_key, 'postKey': k, 'authorKey': followee_key} for k in recent_keys
+    ])
+
+
+def _recent_post_keys(author_key):
+    limit = current_app.config['TIMELINE_BACKFILL_SIZE']
+    return [
+        k for (k,) in db.session.query(Post.postKey)
+        .filter(Post.userKey == author_key)
+        .order_by(Post.postKey.desc())
+        .limit(limit)
+    ]
+
+
+def _run_demote_fan_out(app, author_key):
+    # 셀럽에서 내려온 계정의 최근 글들을 모든 팔로워에게 팬아웃합니다.
+    with app.app_context():
+        try:
+            for post_key in reversed(_recent_post_keys(author_key)):
+                fan_out_post(post_key, author_key)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Demote fan-out failed for member {author_key}: {e}")
+
+
+def leaves_celebrity(follower_count_before):
+    # 언팔로우 한 번으로 팔로워 수가 셀럽 기준 바로 아래로 내려가는지 (기준 -> 기준-1)
+    # 언팔로우 트랜잭션 안에서 Member 행을 잠근 뒤, 줄어들기 전의 값으로 판단해야 합니다.
+    threshold = current_app.config['TIMELINE_CELEBRITY_THRESHOLD']
+    return follower_count_before == threshold
+
+
+def handle_unfollowed(followee_key, crossed):
+    # 셀럽 기준 아래로 내려갔다면(crossed) 최근 글을 모든 팔로워에게 팬아웃합니다.
+    # 팔로우/언팔로우가 기준 근처를 오가면 이 팬아웃이 다시 실행되지만,
+    # INSERT IGNORE 덕분에 이미 있는 줄은 건너뛰고, 비용도 (기준 팔로워 수 x 백필 개수)로 제한됩니다.
+    if not crossed:
+        return
+    app = current_app._get_current_object()
+    _executor.submit(_run_demote_fan_out, app, followee_key)
+
+
+def remove_followee_posts(follower_key, followee_key):
+    # 언팔로우하면 그 사람의 글을 내 타임라인에서 지웁니다.
+    Timeline.query.filter_by(userKey=follower_key, authorKey=followee_key).delete()
+
+
+def read_timeline(user_key, cursor=None, limit=20):
+    # 홈 타임라인 읽기
+    # 1) 미리 만들어 둔 Timeline에서 "userKey = ? AND postKey < cursor" 범위 검색 (기본키 인덱스 사용)
+    query = db.session.query(Timeline.postKey).filter(Timeline.userKey == user_key)
+    if cursor:
+        query = query.filter(Timeline.postKey < cursor)
+    post_keys = [k for (k,) in query.order_by(Timeline.postKey.desc()).limit(limit)]
+
+    # 2) 내가 팔로우하는 셀럽들의 글은 팬아웃되지 않았으므로 Post 테이블에서 직접 가져와 합칩니다.
+    # 내 팔로우 목록(수천 개일 수 있음) 전체를 훑지 않도록, 셀럽 목록(IX_Member_followerCount)에서 출발해서
+    # 각 셀럽마다 Follow 기본키로 "내가 팔로우하는지"만 확인합니다.
+    threshold = current_app.config['TIMELINE_CELEBRITY_THRESHOLD']
+    celebrity_keys = [
+        k for (k,) in db.session.query(Member.userKey)
+        .filter(Member.followerCount >= threshold)
+        .filter(exists().where(Follow.followerKey == user_key, Follow.followeeKey == Member.userKey))
+    ]
+    if celebrity_keys:
+        # 셀럽마다 (userKey, postKey) 인덱스로 최신 글을 limit개만 읽어서 합칩니다.
+        # (IN (...)으로 한꺼번에 읽으면 모든 셀럽의 글 전체를 정렬해야 합니다.)
+        for celebrity_key in celebrity_keys:
+            celeb_query = db.session.query(Post.postKey).filter(Post.userKey == celebrity_key)
+            if cursor:
+                celeb_query = celeb_query.filter(Post.postKey < cursor)
+            post_keys += [k for (k,) in celeb_query.order_by(Post.postKey.desc()).limit(limit)]
+        # 셀럽이 되기 전에 팬아웃된 글은 양쪽에 다 있을 수 있으므로 중복을 제거합니다.
+        post_keys = sorted(set(post_keys), reverse=True)[:limit]
+
+    posts = Post.query.filter(Post.postKey.in_(post_keys)).all() if post_keys else []
+    posts.sort(key=lambda p: p.postKey, reverse=True)
+
+    # 한 페이지를 꽉 채웠으면 다음 페이지가 있을 수 있으므로, 마지막 postKey를 다음 커서로 돌려줍니다.
+    next_cursor = post_keys[-1] if len(post_keys) == limit else None
+    return posts, next_cursor
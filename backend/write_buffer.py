@@ -0,0 +1,414 @@
+import atexit
+import json
+import os
+import threading
+import time
+from sqlalchemy import insert, delete, tuple_
+from models import db, Likes
+
+# ==============================================================================
+# 좋아요 쓰기 버퍼 (Write-behind)
+# ==============================================================================
+# 인기 게시물에 좋아요가 몰리면, 요청마다 commit 하는 방식은 같은 행/인덱스를 두고
+# 아주 작은 트랜잭션 수천 개가 서로 경쟁하게 됩니다.
+# 이 버퍼는 좋아요/취소 요청을 메모리에 모아 두었다가, 일정 개수가 쌓이거나 일정 시간이 지나면
+# 백그라운드 스레드에서 multi-row INSERT / DELETE 한 번으로 DB에 반영합니다.
+# - 같은 (postKey, userKey)에 대해 좋아요 -> 취소처럼 반대 동작이 오면 서로 상쇄되어 DB에는 아무것도 쓰지 않습니다.
+# - 모든 요청은 응답 전에 로컬 파일(spill file)에 기록(fsync)되므로, 서버가 죽어도 다음 시작 때 복구됩니다.
+#   fsync는 잠금 밖에서, 그 사이에 쌓인 요청들을 한 번에 묶어서(group commit) 처리합니다.
+# - 조회 시에는 아직 DB에 반영되지 않은 버퍼 내용을 합쳐서 보여주므로, 내가 누른 좋아요가 바로 보입니다.
+#
+# 여러 워커 프로세스로 실행하는 경우:
+# - spill file은 프로세스마다 따로 씁니다 (<WRITE_BEHIND_SPILL_PATH>.<pid>).
+#   시작할 때 이미 종료된 프로세스가 남긴 파일은 가져와서 복구합니다.
+# - 단, 상쇄와 조회 시 합치기는 같은 프로세스 안의 버퍼끼리만 이루어집니다.
+#   같은 사용자의 요청이 여러 워커로 나뉘어 들어가면 잠시 서로의 변경이 보이지 않을 수 있으므로,
+#   단일 프로세스(또는 사용자별 고정 라우팅)로 운영하는 것을 권장합니다.
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LikeWriteBuffer:
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        # pending: 아직 DB에 쓰기 시작하지 않은 변경 {postKey: {userKey: (desired, baseline)}}
+        #   desired: 최종적으로 원하는 상태 (True = 좋아요)
+        #   baseline: 버퍼에 처음 들어올 때의 상태 (복구된 항목처럼 모르면 None)
+        # inflight: 지금 백그라운드 스레드가 DB에 쓰고 있는 변경 (구조는 pending과 같음)
+        self._pending = {}
+        self._inflight = {}
+        self._pending_count = 0
+        # flush가 DB에 commit 하기 직전과 직후에 1씩 증가합니다. (seqlock 방식)
+        # 홀수이면 commit 진행 중, 짝수이면 DB와 inflight가 서로 맞는 상태입니다.
+        # DB 조회 결과가 버퍼와 어긋난(오래된) 값인지 판단할 때 사용합니다.
+        self._generation = 0
+        # _lock: 메모리 상태와 spill file 쓰기(버퍼까지)를 보호합니다.
+        # _sync_lock: fsync와 spill file 교체를 보호합니다. (항상 _sync_lock -> _lock 순서로 잡습니다)
+        self._lock = threading.Lock()
+        # commit이 끝나(generation이 짝수가 되)기를 기다리는 조회 요청을 깨우는 데 사용합니다.
+        self._settled = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()
+        # _written: spill file에 쓴 줄 수, _synced: 그중 fsync까지 끝난 줄 수
+        self._written = 0
+        self._synced = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._log = None
+        self._started = False
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config['WRITE_BEHIND_ENABLED']
+        if self.enabled:
+            # Flask 디버그 모드의 reloader는 부모 프로세스에서도 이 파일을 import 하므로,
+            # 실제로 요청을 처리하는 프로세스에서 첫 요청이 들어올 때 시작합니다.
+            app.before_request(self._ensure_started)
+
+    # --------------------------------------------------------------------------
+    # 시작 / 종료
+    # --------------------------------------------------------------------------
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._sync_lock, self._lock:
+            if self._started:
+                return
+            self._recover()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='like-write-behind', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+            self._started = True
+
+    def shutdown(self):
+        # 서버 종료 시 남은 버퍼를 모두 DB에 반영하고 끝냅니다.
+        if not self._started:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        with self._sync_lock, self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+            self._started = False
+
+    @property
+    def _spill_path(self):
+        # 프로세스마다 자기 spill file을 씁니다.
+        return f"{self.app.config['WRITE_BEHIND_SPILL_PATH']}.{os.getpid()}"
+
+    def _recoverable_files(self):
+        # 이미 종료된 프로세스(또는 같은 pid를 썼던 이전 실행)가 남긴 spill file 목록을
+        # 오래된 기록부터 읽을 수 있는 순서로 돌려줍니다: 복구 중이던 파일 -> flush 중이던 파일 -> 본 파일
+        base = self.app.config['WRITE_BEHIND_SPILL_PATH']
+        directory, prefix = os.path.split(base)
+        directory = directory or '.'
+        prefix += '.'
+        found = []
+        for name in os.listdir(directory):
+            if not name.startswith(prefix):
+                continue
+            parts = name[len(prefix):].split('.')
+            if not parts[0].isdigit():
+                continue
+            pid = int(parts[0])
+            if pid != os.getpid() and _process_alive(pid):
+                # 살아 있는 다른 워커의 파일은 건드리지 않습니다.
+                continue
+            if len(parts) == 1:
+                rank = (2, 0)
+            elif parts[1:] == ['flushing']:
+                rank = (1, 0)
+            elif len(parts) == 3 and parts[1] == 'claim' and parts[2].isdigit():
+                rank = (0, int(parts[2]))
+            else:
+                # 정리(compaction) 도중의 임시 파일 등은 원본이 남아 있으므로 무시합니다.
+                continue
+            found.append((pid, rank, os.path.join(directory, name)))
+        found.sort()
+        return [path for _, _, path in found]
+
+    def _recover(self):
+        # 이전 실행에서 DB에 반영되지 못한 기록을 spill file에서 읽어 pending으로 되살립니다.
+        # 파일에는 "원하는 최종 상태"가 기록되어 있으므로 같은 항목을 다시 반영해도 결과가 같습니다.
+        # (INSERT IGNORE / DELETE는 여러 번 실행해도 안전)
+        claimed = []
+        for path in self._recoverable_files():
+            # 다른 워커가 같은 파일을 동시에 복구하지 않도록, 먼저 내 이름으로 바꿔서(rename) 가져옵니다.
+            claim_path = f"{self._spill_path}.claim.{time.time_ns()}"
+            try:
+                os.replace(path, claim_path)
+            except FileNotFoundError:
+                continue
+            claimed.append(claim_path)
+
+        for path in claimed:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        post_key, user_key, liked = json.loads(line)
+                    except ValueError:
+                        # 기록 도중 서버가 죽어서 마지막 줄이 잘린 경우
+                        continue
+                    self._set_pending(post_key, user_key, liked, None)
+
+        # 복구한 내용을 내 spill file 하나로 정리(compaction)해서 저장한 뒤, 가져온 파일들을 지웁니다.
+        self._rewrite_log()
+        for path in claimed:
+            os.remove(path)
+
+    def _rewrite_log(self):
+        # _sync_lock과 _lock을 모두 잡은 상태에서 호출해야 합니다.
+        tmp_path = self._spill_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for post_key, users in self._pending.items():
+                for user_key, (desired, _) in users.items():
+                    f.write(json.dumps([post_key, user_key, desired]) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        if self._log:
+            self._log.close()
+        os.replace(tmp_path, self._spill_path)
+        self._log = open(self._spill_path, 'a')
+        self._synced = self._written
+
+    def _sync(self, seq):
+        # seq번째 줄까지 디스크에 기록되었음을 보장합니다.
+        # 먼저 들어온 요청이 fsync 하는 동안 쌓인 줄들은 다음 fsync 한 번으로 함께 처리됩니다.
+        with self._sync_lock:
+            if self._synced >= seq:
+                return
+            with self._lock:
+                target = self._written
+                self._log.flush()
+                fd = self._log.fileno()
+            os.fsync(fd)
+            self._synced = target
+
+    # --------------------------------------------------------------------------
+    # 쓰기 (좋아요 토글)
+    # --------------------------------------------------------------------------
+    def _set_pending(self, post_key, user_key, desired, baseline):
+        users = self._pending.setdefault(post_key, {})
+        if user_key in users:
+            baseline = users[user_key][1]
+        else:
+            self._pending_count += 1
+
+        if baseline is not None and desired == baseline:
+            # 반대 동작끼리 상쇄: 처음 상태로 돌아왔으니 DB에 쓸 필요가 없습니다.
+            del users[user_key]
+            self._pending_count -= 1
+            if not users:
+                del self._pending[post_key]
+        else:
+            users[user_key] = (desired, baseline)
+
+    def _buffered_state(self, post_key, user_key):
+        # 버퍼 기준 현재 상태 (pending이 inflight보다 최신). 버퍼에 없으면 None
+        for buffered in (self._pending, self._inflight):
+            entry = buffered.get(post_key, {}).get(user_key)
+            if entry is not None:
+                return entry[0]
+        return None
+
+    def toggle(self, post_key, user_key, load_liked):
+        # load_liked: 버퍼에 없을 때 DB에서 현재 좋아요 상태를 읽어오는 함수
+        post_key, user_key = int(post_key), int(user_key)
+        while True:
+            generation = self._generation
+            db_liked = None
+            with self._lock:
+                current = self._buffered_state(post_key, user_key)
+            if current is None:
+                # DB 조회는 잠금 밖에서 합니다. (다른 요청들이 기다리지 않도록)
+                # MariaDB(InnoDB)의 기본 격리 수준(REPEATABLE READ)에서는 트랜잭션의 첫 조회 시점에
+                # 스냅샷이 고정되므로, 트랜잭션을 끝내고 generation을 읽은 뒤의 새 스냅샷에서 읽습니다.
+                db.session.rollback()
+                db_liked = load_liked()
+
+            with self._lock:
+                if current is None:
+                    if self._generation != generation:
+                        # 조회하는 사이에 flush가 끝났다면 DB 값이 바뀌었을 수 있으므로 다시 읽습니다.
+                        continue
+                    current = self._buffered_state(post_key, user_key)
+                    if current is None:
+                        current = db_liked
+
+                liked = not current
+                # spill file에는 여기서 쓰기만 하고, fsync는 잠금을 놓은 뒤 _sync에서 묶어서 합니다.
+                self._log.write(json.dumps([post_key, user_key, liked]) + '\n')
+                self._written += 1
+                seq = self._written
+                self._set_pending(post_key, user_key, liked, current)
+
+                if self._pending_count >= self.app.config['WRITE_BEHIND_FLUSH_SIZE']:
+                    self._wake.set()
+
+            # 디스크에 기록된 뒤에 응답합니다. (서버가 죽어도 잃어버리지 않도록)
+            self._sync(seq)
+            return liked
+
+    def discard_post(self, post_key):
+        # 게시물이 삭제되면 그 게시물에 대한 대기 중인 좋아요는 버립니다.
+        with self._lock:
+            users = self._pending.pop(int(post_key), None)
+            if users:
+                self._pending_count -= len(users)
+
+    # --------------------------------------------------------------------------
+    # 읽기 (조회 시 버퍼 내용 합치기)
+    # --------------------------------------------------------------------------
+    def _like_delta(self, post_key):
+        # DB의 좋아요 수에 더해야 할 값 (아직 반영되지 않은 좋아요는 +1, 취소는 -1)
+        delta = 0
+        for buffered in (self._inflight, self._pending):
+            for desired, baseline in buffered.get(post_key, {}).values():
+                if baseline is None:
+                    # 복구된 항목은 원래 상태를 모르므로 숫자에는 반영하지 않습니다.
+                    continue
+                delta += int(desired) - int(baseline)
+        return delta
+
+    def read_likes(self, post_keys, user_key, load_likes):
+        # 게시물들의 좋아요 수와 내가 좋아요를 눌렀는지를, DB 값에 버퍼 내용을 합쳐서 돌려줍니다.
+        # load_likes(): DB에서 ({postKey: 좋아요 수}, {좋아요 누른 postKey 집합})을 읽어오는 함수
+        # 반환값: ({postKey: 좋아요 수}, {postKey: 내가 좋아요를 눌렀는지})
+        #
+        # DB 스냅샷과 버퍼가 서로 다른 시점을 보면, 방금 flush된 좋아요가 양쪽 어디에도 없거나
+        # 양쪽에 다 있는 것처럼 보일 수 있습니다. 그래서
+        # 1) commit 중이 아닐 때(generation 짝수)의 generation을 기억하고
+        # 2) 트랜잭션을 끝내서 그 이후의 새 스냅샷에서 DB를 읽은 뒤
+        # 3) 그동안 generation이 그대로일 때만 버퍼 내용을 합칩니다. (바뀌었으면 다시 읽기)
+        post_keys = [int(k) for k in post_keys]
+        user_key = int(user_key) if user_key else None
+        if not self._started:
+            counts, liked = load_likes()
+            return {k: counts.get(k, 0) for k in post_keys}, {k: k in liked for k in post_keys}
+
+        while True:
+            with self._lock:
+                while self._generation % 2:
+                    self._settled.wait()
+                generation = self._generation
+            db.session.rollback()
+            counts, liked = load_likes()
+
+            with self._lock:
+                if self._generation != generation:
+                    continue
+                merged_counts = {}
+                merged_liked = {}
+                for post_key in post_keys:
+                    merged_counts[post_key] = counts.get(post_key, 0) + self._like_delta(post_key)
+                    state = self._buffered_state(post_key, user_key) if user_key else None
+                    merged_liked[post_key] = (post_key in liked) if state is None else state
+                return merged_counts, merged_liked
+
+    # --------------------------------------------------------------------------
+    # DB 반영 (백그라운드 스레드)
+    # --------------------------------------------------------------------------
+    def _run(self):
+        interval = self.app.config['WRITE_BEHIND_FLUSH_INTERVAL']
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            self.flush()
+        # 종료 직전에 남은 것까지 모두 반영
+        self.flush()
+
+    def flush(self):
+        flushing_path = self._spill_path + '.flushing'
+        with self._sync_lock, self._lock:
+            if not self._pending:
+                return
+            # pending을 통째로 inflight로 넘기고, spill file도 새 파일로 교체합니다.
+            # 이후 들어오는 요청은 새 pending / 새 파일에 기록됩니다.
+            # 아직 fsync 되지 않은 줄이 있을 수 있으므로 교체 전에 한 번 fsync 합니다.
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._synced = self._written
+            self._inflight, self._pending = self._pending, {}
+            self._pending_count = 0
+            self._log.close()
+            os.replace(self._spill_path, flushing_path)
+            self._log = open(self._spill_path, 'a')
+
+        inserts = []
+        deletes = []
+        for post_key, users in self._inflight.items():
+            for user_key, (desired, _) in users.items():
+                if desired:
+                    inserts.append({'postKey': post_key, 'userKey': user_key})
+                else:
+                    deletes.append((post_key, user_key))
+
+        batch_size = self.app.config['WRITE_BEHIND_BATCH_SIZE']
+        with self._lock:
+            # commit 시작 (generation 홀수): 이 동안의 조회는 DB와 버퍼 중 어느 쪽이 최신인지 알 수 없습니다.
+            self._generation += 1
+        with self.app.app_context():
+            try:
+                # 이미 있는 좋아요(복구된 항목 등)는 무시하도록 INSERT IGNORE를 사용합니다.
+                insert_stmt = (
+                    insert(Likes)
+                    .prefix_with('IGNORE', dialect='mysql')
+                    .prefix_with('IGNORE', dialect='mariadb')
+                    .prefix_with('OR IGNORE', dialect='sqlite')
+                )
+                for i in range(0, len(inserts), batch_size):
+                    db.session.execute(insert_stmt.values(inserts[i:i + batch_size]))
+                for i in range(0, len(deletes), batch_size):
+                    pairs = deletes[i:i + batch_size]
+                    db.session.execute(delete(Likes).where(tuple_(Likes.postKey, Likes.userKey).in_(pairs)))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Like write-behind flush failed: {e}")
+                self._restore_inflight()
+                return
+
+        with self._lock:
+            # commit 끝 (generation 짝수): DB에 반영된 inflight를 비웁니다.
+            self._inflight = {}
+            self._generation += 1
+            self._settled.notify_all()
+        os.remove(flushing_path)
+
+    def _restore_inflight(self):
+        # DB 반영에 실패하면 inflight를 다시 pending으로 합쳐서 다음 flush 때 재시도합니다.
+        with self._sync_lock, self._lock:
+            for post_key, users in self._inflight.items():
+                for user_key, (desired, baseline) in users.items():
+                    pending_users = self._pending.get(post_key, {})
+                    if user_key in pending_users:
+                        # pending 쪽이 더 최신이므로 원래 상태(baseline)만 inflight 기준으로 되돌립니다.
+                        pending_users[user_key] = (pending_users[user_key][0], baseline)
+                        if baseline is not None and pending_users[user_key][0] == baseline:
+                            del pending_users[user_key]
+                            self._pending_count -= 1
+                            if not pending_users:
+                                del self._pending[post_key]
+                    else:
+                        self._set_pending(post_key, user_key, desired, baseline)
+            self._inflight = {}
+            self._generation += 1
+            self._settled.notify_all()
+            # 두 파일에 나뉘어 있던 기록도 현재 pending 기준으로 다시 정리합니다.
+            self._rewrite_log()
+            os.remove(self._spill_path + '.flushing')
+
+
+like_buffer = LikeWriteBuffer()